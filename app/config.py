@@ -2,28 +2,32 @@ import os
 from functools import lru_cache
 from typing import Literal
 
-from pydantic import BaseSettings, Field, validator
+from pydantic import Field, field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     """Application configuration via environment variables."""
 
-    app_name: str = Field("Webhook Service", env="APP_NAME")
+    model_config = SettingsConfigDict(
+        case_sensitive=False,
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+    app_name: str = Field("Webhook Service", validation_alias="APP_NAME")
 
     # Core config
-    webhook_secret: str = Field("", env="WEBHOOK_SECRET")
-    database_url: str = Field("/data/app.db", env="DATABASE_URL")
-    log_level: str = Field("INFO", env="LOG_LEVEL")
+    webhook_secret: str = Field("", validation_alias="WEBHOOK_SECRET")
+    database_url: str = Field("/data/app.db", validation_alias="DATABASE_URL")
+    log_level: str = Field("INFO", validation_alias="LOG_LEVEL")
 
     # Metrics toggle
-    enable_metrics: bool = Field(True, env="ENABLE_METRICS")
-
-    class Config:
-        case_sensitive = False
-        env_file = ".env"
-        env_file_encoding = "utf-8"
+    enable_metrics: bool = Field(True, validation_alias="ENABLE_METRICS")
 
-    @validator("log_level")
+    @field_validator("log_level")
+    @classmethod
     def normalize_log_level(cls, v: str) -> str:
         return v.upper()
 
@@ -33,5 +37,3 @@ def get_settings() -> Settings:
     """Return cached settings instance."""
 
     return Settings()
-
-
@@ -1,16 +1,42 @@
-import json
 import logging
 import sys
-from datetime import datetime, timezone
+import time
 from typing import Any, Dict
 
+import orjson
+
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_SKIP_KEYS = frozenset(
+    {
+        "args",
+        "msg",
+        "levelname",
+        "levelno",
+        "name",
+        "created",
+        "msecs",
+        "relativeCreated",
+        "lineno",
+        "pathname",
+        "filename",
+        "funcName",
+        "module",
+        "exc_info",
+        "exc_text",
+        "stack_info",
+    }
+)
+
 
 class JsonFormatter(logging.Formatter):
     """Logging formatter that outputs structured JSON."""
 
     def format(self, record: logging.LogRecord) -> str:
         log_record: Dict[str, Any] = {
-            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            # ISO-8601 UTC with millisecond precision, without building a datetime
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -18,33 +44,17 @@ class JsonFormatter(logging.Formatter):
 
         # Include extra fields if present (e.g. request_id, method, path, status, latency_ms, message_id, dup, result)
         for key, value in record.__dict__.items():
-            if key.startswith("_"):
-                continue
-            if key in (
-                "args",
-                "msg",
-                "levelname",
-                "levelno",
-                "name",
-                "created",
-                "msecs",
-                "relativeCreated",
-                "lineno",
-                "pathname",
-                "filename",
-                "funcName",
-                "module",
-                "exc_info",
-                "exc_text",
-                "stack_info",
-            ):
+            if key.startswith("_") or key in _SKIP_KEYS:
                 continue
             log_record[key] = value
 
         if record.exc_info:
             log_record["exc_info"] = self.formatException(record.exc_info)
 
-        return json.dumps(log_record, ensure_ascii=False)
+        # default=str keeps odd extra values loggable, as orjson is stricter than json
+        return orjson.dumps(
+            log_record, default=str, option=orjson.OPT_NON_STR_KEYS
+        ).decode("utf-8")
 
 
 def configure_logging(level_name: str = "INFO") -> None:
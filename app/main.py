@@ -1,42 +1,138 @@
+import asyncio
+import hashlib
 import hmac
-import json
+import itertools
 import logging
+import os
+import secrets
+import ssl
 import time
 
-from hashlib import sha256
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from typing import Optional
-from uuid import uuid4
 
-from fastapi import FastAPI, Header, HTTPException, Query, Request, status
-from fastapi.responses import JSONResponse
+import orjson
+
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse
 
 from .config import get_settings
 from .logging_utils import configure_logging
-from .metrics import messages_stored_total, router as metrics_router, webhook_requests_total
-from .models import MessageIn, MessageOut, MessagesPage, StatsOut, SenderStats
+from .metrics import (
+    WEBHOOK_INVALID_JSON,
+    WEBHOOK_INVALID_PAYLOAD,
+    WEBHOOK_INVALID_SIGNATURE,
+    WEBHOOK_OK,
+    messages_stored_total,
+    router as metrics_router,
+)
+from .models import MessagesPage, StatsOut
 from .storage import get_stats, init_db, insert_message_idempotent, list_messages
+from .validation import validate_message_in
 
 
 logger = logging.getLogger("app")
 
+# Webhook success body, encoded once. A fresh Response is still built per
+# request because the logging middleware sets headers on it.
+_OK_BODY = b'{"status":"ok"}'
+
+# Request IDs are a random per-process prefix plus a counter, so generating
+# one needs no urandom syscall. Forked workers pick a fresh prefix.
+_request_id_prefix = secrets.token_hex(6)
+_request_id_counter = itertools.count()
+
+
+def _reseed_request_ids() -> None:
+    global _request_id_prefix, _request_id_counter
+
+    _request_id_prefix = secrets.token_hex(6)
+    _request_id_counter = itertools.count()
+
+
+if hasattr(os, "register_at_fork"):  # POSIX only
+    os.register_at_fork(after_in_child=_reseed_request_ids)
+
+
+def _new_request_id() -> str:
+    return f"{_request_id_prefix}-{next(_request_id_counter):x}"
+
+
+_LOWER_HEX_DIGITS = frozenset("0123456789abcdef")
+
+
+@lru_cache(maxsize=8)
+def _keyed_hmac(secret: bytes) -> "hmac.HMAC":
+    """Return an HMAC-SHA256 object with `secret` already absorbed.
+
+    Copying this per request skips the ipad/opad key schedule. The "sha256"
+    name routes through OpenSSL's EVP layer, which picks SHA-NI at runtime
+    when the CPU supports it and falls back to the generic code otherwise.
+    """
+
+    return hmac.new(secret, digestmod="sha256")
+
+
+def signature_hasher(secret: bytes) -> "hmac.HMAC":
+    """Return a fresh HMAC-SHA256 hasher keyed with `secret`."""
 
-def verify_signature(secret: str, body: bytes, signature_header: str) -> bool:
-    """Validate HMAC-SHA256 signature."""
+    # Copying the pre-keyed object beats the one-shot hmac.digest(): on
+    # OpenSSL 3 the latter re-fetches the digest and redoes the key schedule
+    # on every call, which costs more than the HMAC object it avoids.
+    return _keyed_hmac(secret).copy()
+
+
+def verify_signature(mac: "hmac.HMAC", signature_header: str) -> bool:
+    """Validate the digest of a fully fed `mac` against the hex signature header."""
 
     try:
-        provided_sig = signature_header.strip()
-    except Exception:
+        sig_hex = signature_header.strip()
+    except AttributeError:
+        return False
+
+    # Accept exactly what hexdigest() produces: 64 lowercase hex characters.
+    # bytes.fromhex alone would also take uppercase and inner whitespace.
+    if len(sig_hex) != 64 or not _LOWER_HEX_DIGITS.issuperset(sig_hex):
         return False
 
-    computed = hmac.new(secret.encode("utf-8"), body, sha256).hexdigest()
-    return hmac.compare_digest(computed, provided_sig)
+    return hmac.compare_digest(mac.digest(), bytes.fromhex(sig_hex))
 
 
 def create_app() -> FastAPI:
     settings = get_settings()
     configure_logging(settings.log_level)
+    logger.info(
+        "Crypto backend",
+        extra={
+            "openssl_version": ssl.OPENSSL_VERSION,
+            "sha256_available": "sha256" in hashlib.algorithms_available,
+        },
+    )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # SQLite allows one writer at a time, so webhook inserts are funnelled
+        # through a single thread (with its own pooled connection) instead of
+        # blocking the event loop. Readers run on the regular threadpool (WAL).
+        # Created per lifespan so the app can be started again after shutdown.
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        app.state.writer_pool = pool
+        try:
+            yield
+        finally:
+            # Waiting for queued writes must not block the event loop
+            await asyncio.to_thread(pool.shutdown)
+
+    app = FastAPI(
+        title=settings.app_name,
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan,
+    )
 
-    app = FastAPI(title=settings.app_name)
+    # Encoded once here rather than on every webhook request
+    secret_bytes = settings.webhook_secret.encode("utf-8")
 
     # Initialize DB
     init_db()
@@ -44,7 +140,7 @@ def create_app() -> FastAPI:
     # Request/response logging middleware
     @app.middleware("http")
     async def logging_middleware(request: Request, call_next):
-        request_id = request.headers.get("X-Request-ID") or str(uuid4())
+        request_id = request.headers.get("X-Request-ID") or _new_request_id()
         request.state.request_id = request_id
 
         start = time.time()
@@ -80,18 +176,24 @@ def create_app() -> FastAPI:
         - JSON body matching the required message schema.
         """
 
-        raw_body = await request.body()
-        settings = get_settings()
-        request_id = getattr(request.state, "request_id", str(uuid4()))
+        request_id = getattr(request.state, "request_id", None) or _new_request_id()
 
-        if not settings.webhook_secret:
+        if not secret_bytes:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="WEBHOOK_SECRET is not configured",
             )
 
-        if not verify_signature(settings.webhook_secret, raw_body, x_signature):
-            webhook_requests_total.labels(result="invalid_signature").inc()
+        # Hash each chunk as it arrives instead of buffering the whole body
+        # first and hashing it in a separate pass.
+        mac = signature_hasher(secret_bytes)
+        raw_body = bytearray()
+        async for chunk in request.stream():
+            mac.update(chunk)
+            raw_body += chunk
+
+        if not verify_signature(mac, x_signature):
+            WEBHOOK_INVALID_SIGNATURE.inc()
             logger.warning(
                 "Invalid webhook signature",
                 extra={
@@ -105,9 +207,9 @@ def create_app() -> FastAPI:
             )
 
         try:
-            body_json = json.loads(raw_body.decode("utf-8"))
-        except json.JSONDecodeError:
-            webhook_requests_total.labels(result="invalid_json").inc()
+            body_json = orjson.loads(raw_body)
+        except orjson.JSONDecodeError:
+            WEBHOOK_INVALID_JSON.inc()
             logger.warning(
                 "Invalid JSON payload",
                 extra={"request_id": request_id, "result": "invalid_json"},
@@ -118,9 +220,9 @@ def create_app() -> FastAPI:
             )
 
         try:
-            payload = MessageIn.parse_obj(body_json)
-        except Exception as exc:
-            webhook_requests_total.labels(result="invalid_payload").inc()
+            row = validate_message_in(body_json)
+        except ValueError as exc:
+            WEBHOOK_INVALID_PAYLOAD.inc()
             logger.warning(
                 "Invalid payload schema",
                 extra={
@@ -134,9 +236,11 @@ def create_app() -> FastAPI:
                 detail="Invalid payload schema",
             )
 
-        created = insert_message_idempotent(payload)
+        created = await asyncio.get_running_loop().run_in_executor(
+            request.app.state.writer_pool, insert_message_idempotent, row
+        )
 
-        webhook_requests_total.labels(result="ok").inc()
+        WEBHOOK_OK.inc()
         if created:
             messages_stored_total.inc()
 
@@ -147,13 +251,17 @@ def create_app() -> FastAPI:
                 "method": request.method,
                 "path": request.url.path,
                 "status": 200,
-                "message_id": payload.message_id,
+                "message_id": row[0],
                 "dup": not created,
                 "result": "ok",
             },
         )
 
-        return JSONResponse(status_code=status.HTTP_200_OK, content={"status": "ok"})
+        return Response(
+            _OK_BODY,
+            status_code=status.HTTP_200_OK,
+            media_type="application/json",
+        )
 
     @app.get("/messages", response_model=MessagesPage)
     def get_messages(
@@ -166,23 +274,10 @@ def create_app() -> FastAPI:
     ):
         """List stored messages with pagination, filters, and ordering."""
 
-        items_raw, total = list_messages(
+        items, total = list_messages(
             limit=limit, offset=offset, from_filter=from_filter, since=since, q=q
         )
 
-        items = [
-            MessageOut(
-                message_id=item["message_id"],
-                **{
-                    "from": item["from"],
-                    "to": item["to"],
-                    "ts": item["ts"],
-                    "text": item["text"],
-                },
-            )
-            for item in items_raw
-        ]
-
         request_id = getattr(request.state, "request_id", None) if request else None
         logger.info(
             "Messages listed",
@@ -197,7 +292,11 @@ def create_app() -> FastAPI:
             },
         )
 
-        return MessagesPage(items=items, total=total, limit=limit, offset=offset)
+        # Storage rows already have the MessagesPage shape; returning the
+        # response directly skips the per-item model validation round trip.
+        return ORJSONResponse(
+            {"items": items, "total": total, "limit": limit, "offset": offset}
+        )
 
     @app.get("/stats", response_model=StatsOut)
     def stats(request: Request):
@@ -217,18 +316,8 @@ def create_app() -> FastAPI:
             },
         )
 
-        stats_obj = StatsOut(
-            total_messages=data["total_messages"],
-            senders_count=data["senders_count"],
-            messages_per_sender=[
-                SenderStats(sender=s["sender"], count=s["count"])
-                for s in data["messages_per_sender"]
-            ],
-            first_message_ts=data["first_message_ts"],
-            last_message_ts=data["last_message_ts"],
-        )
-
-        return stats_obj
+        # get_stats already returns the StatsOut shape
+        return ORJSONResponse(data)
 
     @app.get("/health/live")
     def health_live():
@@ -1,3 +1,6 @@
+import time
+from typing import Tuple
+
 from fastapi import APIRouter
 from fastapi.responses import PlainTextResponse
 from prometheus_client import CollectorRegistry, Counter, generate_latest
@@ -15,6 +18,13 @@ webhook_requests_total = Counter(
     registry=registry,
 )
 
+# Children bound once for every result value, so the webhook path calls
+# .inc() directly instead of resolving labels() on each request.
+WEBHOOK_OK = webhook_requests_total.labels(result="ok")
+WEBHOOK_INVALID_SIGNATURE = webhook_requests_total.labels(result="invalid_signature")
+WEBHOOK_INVALID_JSON = webhook_requests_total.labels(result="invalid_json")
+WEBHOOK_INVALID_PAYLOAD = webhook_requests_total.labels(result="invalid_payload")
+
 messages_stored_total = Counter(
     "messages_stored_total",
     "Total number of messages stored (idempotent; counts new records only)",
@@ -22,6 +32,22 @@ messages_stored_total = Counter(
 )
 
 
+# Scrapes arriving within this window reuse the last rendered exposition
+_METRICS_TTL_SECONDS = 1.0
+_metrics_cache: Tuple[float, bytes] = (float("-inf"), b"")
+
+
+def _render_metrics() -> bytes:
+    global _metrics_cache
+
+    now = time.monotonic()
+    rendered_at, content = _metrics_cache
+    if now - rendered_at >= _METRICS_TTL_SECONDS:
+        content = generate_latest(registry)
+        _metrics_cache = (now, content)
+    return content
+
+
 @router.get("/metrics", include_in_schema=False)
 def metrics() -> PlainTextResponse:
     """Expose Prometheus metrics if enabled."""
@@ -30,9 +56,9 @@ def metrics() -> PlainTextResponse:
     if not settings.enable_metrics:
         return PlainTextResponse("", status_code=404)
 
-    content = generate_latest(registry)
+    # Bytes are sent as-is; no decode/re-encode round trip
     return PlainTextResponse(
-        content.decode("utf-8"),
+        _render_metrics(),
         media_type="text/plain; version=0.0.4; charset=utf-8",
     )
 
@@ -1,41 +1,43 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Annotated, List, Optional
 
-import re
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints, field_validator
 
 
-E164_REGEX = re.compile(r"^\+[1-9]\d{1,14}$")
+# Pattern and length constraints are enforced by pydantic-core, not in Python.
+# E.164 digits are ASCII only; an explicit [0-9] class keeps the compiled
+# matcher far smaller (and faster) than the Unicode-aware \d.
+E164Number = Annotated[str, StringConstraints(pattern=r"^\+[1-9][0-9]{1,14}$")]
 
 
 class MessageIn(BaseModel):
-    """Incoming webhook message schema."""
+    """Incoming webhook message schema.
+
+    This is the declarative reference for the webhook body; the request path
+    itself uses `app.validation.validate_message_in`, which enforces the same rules.
+    """
+
+    # coerce_numbers_to_str keeps pydantic v1's lax str handling, where a
+    # numeric message_id or text was accepted and stored as its string form.
+    model_config = ConfigDict(populate_by_name=True, coerce_numbers_to_str=True)
 
     message_id: str = Field(..., description="Unique identifier for the message")
-    from_: str = Field(..., alias="from", description="Sender phone number in E.164")
-    to: str = Field(..., description="Recipient phone number in E.164")
+    from_: E164Number = Field(..., alias="from", description="Sender phone number in E.164")
+    to: E164Number = Field(..., description="Recipient phone number in E.164")
     ts: str = Field(..., description="Timestamp in ISO-8601 UTC with Z")
-    text: Optional[str] = Field(None, description="Optional message text (max 4096)")
+    text: Optional[str] = Field(
+        None, max_length=4096, description="Optional message text (max 4096)"
+    )
 
-    @validator("message_id")
+    @field_validator("message_id")
+    @classmethod
     def validate_message_id(cls, v: str) -> str:
         if not v or not v.strip():
             raise ValueError("message_id must be non-empty")
         return v
 
-    @validator("from_")
-    def validate_from(cls, v: str) -> str:
-        if not E164_REGEX.match(v):
-            raise ValueError("from must be in E.164 format")
-        return v
-
-    @validator("to")
-    def validate_to(cls, v: str) -> str:
-        if not E164_REGEX.match(v):
-            raise ValueError("to must be in E.164 format")
-        return v
-
-    @validator("ts")
+    @field_validator("ts")
+    @classmethod
     def validate_ts(cls, v: str) -> str:
         try:
             # Must be ISO-8601 with Z
@@ -46,27 +48,17 @@ class MessageIn(BaseModel):
             raise ValueError("ts must be ISO-8601 UTC with Z")
         return v
 
-    @validator("text")
-    def validate_text(cls, v: Optional[str]) -> Optional[str]:
-        if v is not None and len(v) > 4096:
-            raise ValueError("text must be at most 4096 characters")
-        return v
-
-    class Config:
-        allow_population_by_field_name = True
-
 
 class MessageOut(BaseModel):
     """API representation of a stored message."""
 
+    model_config = ConfigDict(populate_by_name=True)
+
     message_id: str
     from_: str = Field(..., alias="from")
     to: str
     ts: str
-    text: Optional[str]
-
-    class Config:
-        allow_population_by_field_name = True
+    text: Optional[str] = None
 
 
 class MessagesPage(BaseModel):
@@ -1,10 +1,27 @@
 import os
 import sqlite3
+import threading
 from contextlib import contextmanager
 from typing import Dict, Iterable, List, Optional, Tuple
 
 from .config import get_settings
-from .models import MessageIn
+from .validation import MessageRow
+
+
+# Applied to every pooled connection. WAL lets readers proceed while a write
+# is in flight; the rest keep SQLite's page cache and temp data in memory.
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA mmap_size=268435456",
+)
+
+_local = threading.local()
+
+# Shortest `q` the trigram FTS index can match; shorter ones fall back to LIKE
+_FTS_MIN_QUERY_LEN = 3
 
 
 def _get_db_path() -> str:
@@ -20,61 +37,279 @@ def init_db() -> None:
     db_dir = os.path.dirname(db_path)
     if db_dir:
         os.makedirs(db_dir, exist_ok=True)
-    conn = sqlite3.connect(db_path)
-    try:
+    with get_connection() as conn:
+        # One transaction, so workers starting together cannot both backfill
+        # the derived tables (or see them half-created).
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _create_schema(conn)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        conn.execute("PRAGMA optimize")
+
+
+_MESSAGES_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY,
+        message_id TEXT NOT NULL UNIQUE,
+        from_msisdn TEXT NOT NULL,
+        to_msisdn TEXT NOT NULL,
+        ts TEXT NOT NULL,
+        text TEXT,
+        created_at TEXT NOT NULL DEFAULT (datetime('now'))
+    )
+"""
+
+
+def _migrate_messages_id(conn: sqlite3.Connection) -> None:
+    """Rebuild a pre-`id` messages table so it has a stable integer key.
+
+    messages_fts refers to rows by rowid. Without an INTEGER PRIMARY KEY
+    alias, VACUUM may renumber implicit rowids and the FTS index would point
+    at the wrong messages.
+    """
+
+    columns = [r["name"] for r in conn.execute("PRAGMA table_info(messages)")]
+    if not columns or "id" in columns:
+        return
+
+    # The old FTS table and triggers are keyed on the implicit rowid; they
+    # are recreated (and the index rebuilt) by _create_schema.
+    for trigger in ("messages_fts_ai", "messages_fts_ad", "messages_fts_au",
+                    "messages_stats_ai", "messages_stats_ad", "messages_stats_au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("DROP TABLE IF EXISTS messages_fts")
+
+    conn.execute(_MESSAGES_TABLE_SQL.format(name="messages_new"))
+    conn.execute(
+        """
+        INSERT INTO messages_new (message_id, from_msisdn, to_msisdn, ts, text, created_at)
+        SELECT message_id, from_msisdn, to_msisdn, ts, text, created_at
+        FROM messages ORDER BY rowid
+        """
+    )
+    conn.execute("DROP TABLE messages")
+    conn.execute("ALTER TABLE messages_new RENAME TO messages")
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    _migrate_messages_id(conn)
+    # `id` is the stable rowid alias that messages_fts is keyed on; the
+    # public identifier stays message_id.
+    conn.execute(_MESSAGES_TABLE_SQL.format(name="messages"))
+    # Composite indexes match the /messages ordering (ts, message_id) so
+    # pages are read in index order without a sort step. They supersede
+    # the earlier single-column indexes.
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_messages_ts_mid ON messages(ts, message_id)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_messages_from_ts "
+        "ON messages(from_msisdn, ts, message_id)"
+    )
+    conn.execute("DROP INDEX IF EXISTS idx_messages_ts")
+    conn.execute("DROP INDEX IF EXISTS idx_messages_from")
+
+    # Full-text index over messages.text for the `q` filter. The trigram
+    # tokenizer gives substring matching, like the LIKE search it replaces.
+    # Unlike LIKE, its case folding also covers non-ASCII letters.
+    fts_exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'"
+    ).fetchone()
+    conn.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+            text, content='messages', content_rowid='id', tokenize='trigram'
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_fts(rowid, text) VALUES (new.id, new.text);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, text)
+            VALUES ('delete', old.id, old.text);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF text ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, text)
+            VALUES ('delete', old.id, old.text);
+            INSERT INTO messages_fts(rowid, text) VALUES (new.id, new.text);
+        END
+        """
+    )
+    if not fts_exists:
+        # Index rows stored before the FTS table existed
+        conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+
+    # Pre-aggregated counters read by get_stats, kept current by triggers so
+    # /stats never scans messages.
+    stats_exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stats_singleton'"
+    ).fetchone()
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sender_counts (
+            sender TEXT PRIMARY KEY,
+            cnt INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sender_counts_cnt ON sender_counts(cnt)"
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS stats_singleton (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            total INTEGER NOT NULL,
+            senders INTEGER NOT NULL,
+            first_ts TEXT,
+            last_ts TEXT
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_stats_ai AFTER INSERT ON messages BEGIN
+            INSERT INTO sender_counts(sender, cnt) VALUES (new.from_msisdn, 1)
+            ON CONFLICT(sender) DO UPDATE SET cnt = cnt + 1;
+            UPDATE stats_singleton SET
+                total = total + 1,
+                senders = senders + (
+                    SELECT cnt = 1 FROM sender_counts WHERE sender = new.from_msisdn
+                ),
+                first_ts = CASE
+                    WHEN first_ts IS NULL OR new.ts < first_ts THEN new.ts
+                    ELSE first_ts END,
+                last_ts = CASE
+                    WHEN last_ts IS NULL OR new.ts > last_ts THEN new.ts
+                    ELSE last_ts END
+            WHERE id = 0;
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_stats_ad AFTER DELETE ON messages BEGIN
+            UPDATE sender_counts SET cnt = cnt - 1 WHERE sender = old.from_msisdn;
+            UPDATE stats_singleton SET
+                total = total - 1,
+                senders = senders - (
+                    SELECT COUNT(*) FROM sender_counts
+                    WHERE sender = old.from_msisdn AND cnt = 0
+                ),
+                first_ts = (SELECT MIN(ts) FROM messages),
+                last_ts = (SELECT MAX(ts) FROM messages)
+            WHERE id = 0;
+            DELETE FROM sender_counts WHERE sender = old.from_msisdn AND cnt = 0;
+        END
+        """
+    )
+    # The app never updates rows, but keep the counters right if anything does
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_stats_au
+        AFTER UPDATE OF from_msisdn, ts ON messages BEGIN
+            UPDATE sender_counts SET cnt = cnt - 1 WHERE sender = old.from_msisdn;
+            INSERT INTO sender_counts(sender, cnt) VALUES (new.from_msisdn, 1)
+            ON CONFLICT(sender) DO UPDATE SET cnt = cnt + 1;
+            DELETE FROM sender_counts WHERE sender = old.from_msisdn AND cnt = 0;
+            UPDATE stats_singleton SET
+                senders = (SELECT COUNT(*) FROM sender_counts),
+                first_ts = (SELECT MIN(ts) FROM messages),
+                last_ts = (SELECT MAX(ts) FROM messages)
+            WHERE id = 0;
+        END
+        """
+    )
+    if not stats_exists:
+        # Seed the counters from rows stored before these tables existed
         conn.execute(
             """
-            CREATE TABLE IF NOT EXISTS messages (
-                message_id TEXT PRIMARY KEY,
-                from_msisdn TEXT NOT NULL,
-                to_msisdn TEXT NOT NULL,
-                ts TEXT NOT NULL,
-                text TEXT,
-                created_at TEXT NOT NULL DEFAULT (datetime('now'))
-            )
+            INSERT INTO sender_counts(sender, cnt)
+            SELECT from_msisdn, COUNT(*) FROM messages GROUP BY from_msisdn
             """
         )
         conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_messages_ts ON messages(ts)"
-        )
-        conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_messages_from ON messages(from_msisdn)"
+            """
+            INSERT INTO stats_singleton(id, total, senders, first_ts, last_ts)
+            SELECT 0, COUNT(*), COUNT(DISTINCT from_msisdn), MIN(ts), MAX(ts)
+            FROM messages
+            """
         )
-        conn.commit()
-    finally:
-        conn.close()
+
+
+def _open_connection(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
 
 
 @contextmanager
 def get_connection():
-    """Yield a SQLite connection with row factory set to Row."""
+    """Yield this thread's pooled SQLite connection (autocommit, Row factory).
+
+    The connection is opened on first use and kept open for later requests
+    served by the same thread, so the page cache stays warm.
+    """
 
     db_path = _get_db_path()
-    conn = sqlite3.connect(db_path, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-    finally:
-        conn.close()
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "db_path", None) != db_path:
+        if conn is not None:
+            conn.close()
+        conn = _open_connection(db_path)
+        _local.conn = conn
+        _local.db_path = db_path
+    yield conn
+
+
+_INSERT_MESSAGE_SQL = """
+    INSERT INTO messages (message_id, from_msisdn, to_msisdn, ts, text, created_at)
+    VALUES (?, ?, ?, ?, ?, datetime('now'))
+    ON CONFLICT(message_id) DO NOTHING
+"""
 
 
-def insert_message_idempotent(msg: MessageIn) -> bool:
+def insert_message_idempotent(row: MessageRow) -> bool:
     """Insert a message; return True if created, False if duplicate (idempotent)."""
 
     with get_connection() as conn:
+        cursor = conn.execute(_INSERT_MESSAGE_SQL, row)
+        # A duplicate message_id leaves the table untouched (rowcount == 0)
+        return cursor.rowcount == 1
+
+
+def insert_messages_many(rows: Iterable[MessageRow]) -> int:
+    """Insert messages in one transaction; return how many were newly created."""
+
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
         try:
-            conn.execute(
-                """
-                INSERT INTO messages (message_id, from_msisdn, to_msisdn, ts, text, created_at)
-                VALUES (?, ?, ?, ?, ?, datetime('now'))
-                """,
-                (msg.message_id, msg.from_, msg.to, msg.ts, msg.text),
-            )
-            conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            # Unique constraint on message_id violated – treat as duplicate
-            return False
+            cursor = conn.executemany(_INSERT_MESSAGE_SQL, rows)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        # rowcount sums rows inserted across the batch (trigger writes excluded)
+        created = cursor.rowcount
+        # Refresh planner statistics after a bulk load (ANALYZE where needed)
+        conn.execute("PRAGMA optimize")
+        return created
 
 
 def list_messages(
@@ -99,8 +334,18 @@ def list_messages(
         params.append(since)
 
     if q:
-        where_clauses.append("text LIKE ?")
-        params.append(f"%{q}%")
+        if len(q) >= _FTS_MIN_QUERY_LEN:
+            where_clauses.append(
+                "id IN (SELECT rowid FROM messages_fts WHERE messages_fts MATCH ?)"
+            )
+            # Quote as a single FTS5 phrase so q is matched literally
+            params.append('"' + q.replace('"', '""') + '"')
+        else:
+            # Trigram index cannot answer queries shorter than three characters.
+            # Escape LIKE wildcards so q is literal here too, as on the FTS path.
+            escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            where_clauses.append("text LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
 
     where_sql = ""
     if where_clauses:
@@ -112,14 +357,16 @@ def list_messages(
     """
 
     with get_connection() as conn:
-        # Total count
+        # Total count. Kept separate from the page query: a window count would
+        # have to materialize every matching row before LIMIT applies, while
+        # COUNT(*) alone is answered from the smallest covering index.
         total_row = conn.execute(f"SELECT COUNT(*) AS cnt {base_query}", params).fetchone()
         total = int(total_row["cnt"]) if total_row else 0
 
         # Data query with ordering: ts ASC, message_id ASC
         rows = conn.execute(
             f"""
-            SELECT message_id, from_msisdn, to_msisdn, ts, text, created_at
+            SELECT message_id, from_msisdn, to_msisdn, ts, text
             {base_query}
             ORDER BY ts ASC, message_id ASC
             LIMIT ? OFFSET ?
@@ -142,22 +389,17 @@ def list_messages(
 
 
 def get_stats() -> Dict:
-    """Compute analytics statistics."""
+    """Return analytics statistics from the trigger-maintained counters."""
 
     with get_connection() as conn:
-        total_row = conn.execute("SELECT COUNT(*) AS cnt FROM messages").fetchone()
-        total_messages = int(total_row["cnt"]) if total_row else 0
-
-        senders_row = conn.execute(
-            "SELECT COUNT(DISTINCT from_msisdn) AS cnt FROM messages"
+        summary = conn.execute(
+            "SELECT total, senders, first_ts, last_ts FROM stats_singleton WHERE id = 0"
         ).fetchone()
-        senders_count = int(senders_row["cnt"]) if senders_row else 0
 
         top_senders_rows = conn.execute(
             """
-            SELECT from_msisdn AS sender, COUNT(*) AS cnt
-            FROM messages
-            GROUP BY from_msisdn
+            SELECT sender, cnt
+            FROM sender_counts
             ORDER BY cnt DESC
             LIMIT 10
             """
@@ -166,22 +408,10 @@ def get_stats() -> Dict:
             {"sender": r["sender"], "count": int(r["cnt"])} for r in top_senders_rows
         ]
 
-        first_row = conn.execute(
-            "SELECT ts FROM messages ORDER BY ts ASC, message_id ASC LIMIT 1"
-        ).fetchone()
-        last_row = conn.execute(
-            "SELECT ts FROM messages ORDER BY ts DESC, message_id DESC LIMIT 1"
-        ).fetchone()
-
-        first_ts = first_row["ts"] if first_row else None
-        last_ts = last_row["ts"] if last_row else None
-
     return {
-        "total_messages": total_messages,
-        "senders_count": senders_count,
+        "total_messages": int(summary["total"]) if summary else 0,
+        "senders_count": int(summary["senders"]) if summary else 0,
         "messages_per_sender": messages_per_sender,
-        "first_message_ts": first_ts,
-        "last_message_ts": last_ts,
+        "first_message_ts": summary["first_ts"] if summary else None,
+        "last_message_ts": summary["last_ts"] if summary else None,
     }
-
-
@@ -0,0 +1,72 @@
+"""Hand-rolled webhook body validation.
+
+Kept free of pydantic/FastAPI imports so it can be compiled with mypyc
+(see `make mypyc`); the rules mirror `app.models.MessageIn`.
+"""
+
+from datetime import datetime
+from typing import Any, Optional, Tuple, TypeGuard
+
+
+# (message_id, from, to, ts, text) in the column order of the messages table
+MessageRow = Tuple[str, str, str, str, Optional[str]]
+
+
+def _is_e164(v: Any) -> TypeGuard[str]:
+    # Same rule as E164Number: "+", a non-zero digit, then 1-14 ASCII digits
+    return (
+        type(v) is str
+        and 3 <= len(v) <= 16
+        and v[0] == "+"
+        and "1" <= v[1] <= "9"
+        and v.isascii()
+        and v[1:].isdigit()
+    )
+
+
+def _coerce_str(v: Any) -> Any:
+    # Like MessageIn's coerce_numbers_to_str: JSON numbers become str (bools do not)
+    if type(v) is int or type(v) is float:
+        return str(v)
+    return v
+
+
+def validate_message_in(data: Any) -> MessageRow:
+    """Validate a decoded webhook body against the MessageIn rules.
+
+    Returns the message as a `MessageRow` ready for insertion, without
+    building a model instance. Raises ValueError on the first violation.
+    """
+
+    if type(data) is not dict:
+        raise ValueError("payload must be a JSON object")
+
+    message_id = _coerce_str(data.get("message_id"))
+    if type(message_id) is not str or not message_id.strip():
+        raise ValueError("message_id must be non-empty")
+
+    # MessageIn also accepts its field name (populate_by_name); the alias wins
+    from_ = _coerce_str(data["from"] if "from" in data else data.get("from_"))
+    if not _is_e164(from_):
+        raise ValueError("from must be in E.164 format")
+
+    to = _coerce_str(data.get("to"))
+    if not _is_e164(to):
+        raise ValueError("to must be in E.164 format")
+
+    ts = _coerce_str(data.get("ts"))
+    if type(ts) is not str or not ts.endswith("Z"):
+        raise ValueError("ts must be ISO-8601 UTC with Z")
+    try:
+        datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError("ts must be ISO-8601 UTC with Z")
+
+    text = _coerce_str(data.get("text"))
+    if text is not None:
+        if type(text) is not str:
+            raise ValueError("text must be a string")
+        if len(text) > 4096:
+            raise ValueError("text must be at most 4096 characters")
+
+    return message_id, from_, to, ts, text
@@ -3,8 +3,13 @@ from hashlib import sha256
 import json
 import os
 import pathlib
+import sqlite3
+import types
+from uuid import uuid4
 
+import pytest
 from fastapi.testclient import TestClient
+from pydantic import ValidationError
 
 
 BASE_DIR = pathlib.Path(__file__).resolve().parent.parent
@@ -14,16 +19,43 @@ os.environ["WEBHOOK_SECRET"] = "testsecret"
 os.environ["DATABASE_URL"] = str(TEST_DB_PATH)
 os.environ["LOG_LEVEL"] = "DEBUG"
 
-from app.main import app  # noqa: E402
+from app import metrics, storage  # noqa: E402
+from app.config import get_settings  # noqa: E402
+from app.main import app, create_app  # noqa: E402
+from app.models import MessageIn  # noqa: E402
+from app.validation import validate_message_in  # noqa: E402
 
 
 client = TestClient(app)
 
 
+@pytest.fixture(scope="module", autouse=True)
+def app_lifespan():
+    # Run startup/shutdown once so lifespan-owned resources exist
+    with client:
+        yield
+
+
+@pytest.fixture
+def scratch_db(tmp_path, monkeypatch):
+    # Point storage at a fresh database via settings; patching
+    # storage._get_db_path would not reach mypyc-compiled callers
+    db_path = tmp_path / "scratch.db"
+    monkeypatch.setenv("DATABASE_URL", str(db_path))
+    get_settings.cache_clear()
+    yield db_path
+    get_settings.cache_clear()
+
+
 def sign(body: bytes, secret: str) -> str:
     return hmac.new(secret.encode("utf-8"), body, sha256).hexdigest()
 
 
+def post_message(message: dict):
+    body = json.dumps(message).encode("utf-8")
+    return client.post("/webhook", content=body, headers={"X-Signature": sign(body, "testsecret")})
+
+
 def make_message(mid: str, from_: str = "+919876543210", to: str = "+14155550100", ts: str = "2025-01-15T10:00:00Z", text: str = "Hello"):
     return {
         "message_id": mid,
@@ -125,3 +157,295 @@ def test_stats_endpoint():
     assert "messages_per_sender" in stats
     assert isinstance(stats["total_messages"], int)
 
+
+def test_webhook_malformed_signature():
+    payload = make_message("m-malformed-signature")
+    body = json.dumps(payload).encode("utf-8")
+
+    r = client.post("/webhook", data=body, headers={"X-Signature": "not-hex"})
+    assert r.status_code == 401
+
+
+def test_webhook_signature_must_be_lowercase_hexdigest():
+    payload = make_message("m-signature-format")
+    body = json.dumps(payload).encode("utf-8")
+    sig = sign(body, "testsecret")
+
+    # Only the exact hexdigest (optionally padded) is accepted
+    for bad in (sig.upper(), " ".join(sig[i : i + 2] for i in range(0, len(sig), 2)), sig[:-2]):
+        r = client.post("/webhook", data=body, headers={"X-Signature": bad})
+        assert r.status_code == 401, bad
+
+    r = client.post("/webhook", data=body, headers={"X-Signature": f" {sig} "})
+    assert r.status_code == 200
+
+
+def test_webhook_invalid_json():
+    body = b'{"message_id": "m-bad-json",'
+    sig = sign(body, "testsecret")
+
+    r = client.post("/webhook", data=body, headers={"X-Signature": sig})
+    assert r.status_code == 400
+
+
+def test_webhook_rejects_non_ascii_digits():
+    # Arabic-Indic digits satisfy a Unicode \d but are not valid E.164
+    r = post_message(make_message("m-bad-digits", to="+١٢٣٤٥"))
+    assert r.status_code == 422
+
+
+def test_insert_messages_many_skips_duplicates():
+    # The test DB persists between runs, so use fresh ids
+    first, second = f"m-bulk-{uuid4()}", f"m-bulk-{uuid4()}"
+    rows = [
+        validate_message_in(make_message(first)),
+        validate_message_in(make_message(second)),
+        validate_message_in(make_message(first)),
+    ]
+    assert storage.insert_messages_many(rows) == 2
+    assert storage.insert_messages_many(rows) == 0
+
+
+def test_messages_total_past_last_page():
+    r_all = client.get("/messages", params={"limit": 1})
+    total = r_all.json()["total"]
+    assert total > 0
+
+    r_past = client.get("/messages", params={"limit": 1, "offset": total})
+    assert r_past.status_code == 200
+    data = r_past.json()
+    assert data["items"] == []
+    assert data["total"] == total
+
+
+def test_messages_text_search_substrings():
+    r = post_message(make_message("m-fts-1", from_="+33333333333", text='Quoted "needle" inside'))
+    assert r.status_code == 200
+
+    # Mid-word substring, case-insensitive, and embedded quotes
+    for q in ("eedl", "QUOTED", '"needle"'):
+        r_q = client.get("/messages", params={"q": q, "from": "+33333333333"})
+        assert [item["message_id"] for item in r_q.json()["items"]] == ["m-fts-1"]
+
+    # Queries shorter than a trigram still work
+    r_short = client.get("/messages", params={"q": "de", "from": "+33333333333"})
+    assert [item["message_id"] for item in r_short.json()["items"]] == ["m-fts-1"]
+
+
+def test_stats_counters_match_messages():
+    stats = client.get("/stats").json()
+
+    conn = sqlite3.connect(TEST_DB_PATH)
+    try:
+        total, senders, first_ts, last_ts = conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT from_msisdn), MIN(ts), MAX(ts) FROM messages"
+        ).fetchone()
+    finally:
+        conn.close()
+
+    assert stats["total_messages"] == total
+    assert stats["senders_count"] == senders
+    assert stats["first_message_ts"] == first_ts
+    assert stats["last_message_ts"] == last_ts
+    assert sum(s["count"] for s in stats["messages_per_sender"]) <= total
+
+
+def test_validate_message_in_matches_model():
+    cases = [
+        make_message("ok"),
+        {k: v for k, v in make_message("no-text").items() if k != "text"},
+        make_message("null-text", text=None),
+        make_message("max-text", text="x" * 4096),
+        make_message("long-text", text="x" * 4097),
+        make_message("   "),
+        make_message("short", from_="+1"),
+        make_message("leading-zero", from_="+0123"),
+        make_message("too-long", to="+1234567890123456"),
+        make_message("no-plus", to="14155550100"),
+        make_message("trailing-newline", to="+14155550100\n"),
+        make_message("offset-ts", ts="2025-01-15T10:00:00+00:00"),
+        make_message("bad-ts", ts="2025-13-15T10:00:00Z"),
+        make_message("int-ts", ts=20250115),
+        {"message_id": 1, "from": "+14155550100", "to": "+14155550100", "ts": "2025-01-15T10:00:00Z"},
+        make_message("int-text", text=5),
+        make_message("float-text", text=1.5),
+        make_message("bool-text", text=True),
+        {"message_id": True, "from": "+14155550100", "to": "+14155550100", "ts": "2025-01-15T10:00:00Z"},
+        make_message("int-from", from_=14155550100),
+        ["not", "an", "object"],
+        {"message_id": "by-name", "from_": "+14155550100", "to": "+14155550100", "ts": "2025-01-15T10:00:00Z"},
+        {"message_id": "alias-wins", "from": "bad", "from_": "+14155550100", "to": "+14155550100", "ts": "2025-01-15T10:00:00Z"},
+    ]
+    for case in cases:
+        try:
+            m = MessageIn.model_validate(case)
+            model_row = (m.message_id, m.from_, m.to, m.ts, m.text)
+        except ValidationError:
+            model_row = None
+
+        try:
+            fast_row = validate_message_in(case)
+        except ValueError:
+            fast_row = None
+
+        assert fast_row == model_row, case
+
+
+def test_metrics_endpoint():
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert "webhook_requests_total" in r.text
+
+
+def test_request_id_header():
+    r1 = client.get("/health/live")
+    r2 = client.get("/health/live")
+    assert r1.headers["X-Request-ID"] != r2.headers["X-Request-ID"]
+
+    r3 = client.get("/health/live", headers={"X-Request-ID": "given-id"})
+    assert r3.headers["X-Request-ID"] == "given-id"
+
+
+def test_webhook_chunked_body():
+    payload = make_message("m-chunked-1", text="x" * 2000)
+    body = json.dumps(payload).encode("utf-8")
+    sig = sign(body, "testsecret")
+
+    def chunks():
+        for i in range(0, len(body), 512):
+            yield body[i : i + 512]
+
+    r = client.post("/webhook", content=chunks(), headers={"X-Signature": sig})
+    assert r.status_code == 200
+    assert r.json() == {"status": "ok"}
+
+
+def test_init_db_migrates_baseline_schema(scratch_db):
+    conn = sqlite3.connect(scratch_db)
+    conn.executescript(
+        """
+        CREATE TABLE messages (
+            message_id TEXT PRIMARY KEY,
+            from_msisdn TEXT NOT NULL,
+            to_msisdn TEXT NOT NULL,
+            ts TEXT NOT NULL,
+            text TEXT,
+            created_at TEXT NOT NULL DEFAULT (datetime('now'))
+        );
+        CREATE INDEX idx_messages_ts ON messages(ts);
+        CREATE INDEX idx_messages_from ON messages(from_msisdn);
+        INSERT INTO messages (message_id, from_msisdn, to_msisdn, ts, text) VALUES
+            ('b1', '+111', '+999', '2025-01-02T00:00:00Z', 'alpha beta'),
+            ('b2', '+111', '+999', '2025-01-01T00:00:00Z', 'gamma delta'),
+            ('b3', '+222', '+999', '2025-01-03T00:00:00Z', NULL);
+        """
+    )
+    conn.close()
+
+    storage.init_db()
+
+    with storage.get_connection() as conn:
+        columns = [r["name"] for r in conn.execute("PRAGMA table_info(messages)")]
+        indexes = {r["name"] for r in conn.execute("PRAGMA index_list(messages)")}
+    assert "id" in columns
+    assert not {"idx_messages_ts", "idx_messages_from"} & indexes
+
+    items, total = storage.list_messages(limit=10, offset=0, q="mma del")
+    assert ([i["message_id"] for i in items], total) == (["b2"], 1)
+
+    stats = storage.get_stats()
+    assert stats["total_messages"] == 3
+    assert stats["senders_count"] == 2
+    assert stats["messages_per_sender"][0] == {"sender": "+111", "count": 2}
+    assert stats["first_message_ts"] == "2025-01-01T00:00:00Z"
+    assert stats["last_message_ts"] == "2025-01-03T00:00:00Z"
+
+    # Triggers are live on the migrated table
+    assert storage.insert_message_idempotent(
+        ("b4", "+333", "+999", "2025-01-04T00:00:00Z", "epsilon")
+    )
+    items, _ = storage.list_messages(limit=10, offset=0, q="epsilon")
+    assert [i["message_id"] for i in items] == ["b4"]
+    assert storage.get_stats()["senders_count"] == 3
+
+
+def test_messages_text_search_wildcards_are_literal():
+    r = post_message(make_message("m-like-1", from_="+55555555555", text="100% sure"))
+    assert r.status_code == 200
+
+    def ids(q):
+        r_q = client.get("/messages", params={"q": q, "from": "+55555555555"})
+        return [item["message_id"] for item in r_q.json()["items"]]
+
+    # Short queries (LIKE path) and trigram queries (FTS path) agree
+    assert ids("0%") == ["m-like-1"]
+    assert ids("0% s") == ["m-like-1"]
+    assert ids("_") == []
+    assert ids("1_0") == []
+
+
+def test_metrics_cached_within_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(metrics, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    monkeypatch.setattr(metrics, "_metrics_cache", (float("-inf"), b""))
+
+    first = client.get("/metrics").content
+    metrics.WEBHOOK_OK.inc()
+
+    # Within the TTL the previous exposition is served unchanged
+    now[0] += metrics._METRICS_TTL_SECONDS / 2
+    assert client.get("/metrics").content == first
+
+    # Once the TTL has passed the counter change shows up
+    now[0] += metrics._METRICS_TTL_SECONDS
+    assert client.get("/metrics").content != first
+
+
+def test_app_survives_repeated_lifespans():
+    # A separate app, so the shared client's lifespan is left untouched
+    other_app = create_app()
+    payload = make_message("m-lifespan-1")
+    body = json.dumps(payload).encode("utf-8")
+    sig = sign(body, "testsecret")
+
+    for _ in range(2):
+        with TestClient(other_app) as other_client:
+            r = other_client.post("/webhook", content=body, headers={"X-Signature": sig})
+            assert r.status_code == 200
+
+
+def test_webhook_coerces_numeric_fields_to_str():
+    r = post_message(make_message(987654321, from_="+66666666666", text=5))
+    assert r.status_code == 200
+
+    items = client.get("/messages", params={"from": "+66666666666"}).json()["items"]
+    assert [(item["message_id"], item["text"]) for item in items] == [("987654321", "5")]
+
+
+def test_stats_counters_follow_updates(scratch_db):
+    storage.init_db()
+    storage.insert_messages_many(
+        [
+            ("u1", "+111", "+999", "2025-01-02T00:00:00Z", None),
+            ("u2", "+111", "+999", "2025-01-03T00:00:00Z", None),
+            ("u3", "+222", "+999", "2025-01-04T00:00:00Z", None),
+        ]
+    )
+
+    with storage.get_connection() as conn:
+        conn.execute(
+            "UPDATE messages SET from_msisdn = '+333', ts = '2025-01-01T00:00:00Z' "
+            "WHERE message_id = 'u3'"
+        )
+        conn.execute("UPDATE messages SET ts = '2025-01-09T00:00:00Z' WHERE message_id = 'u2'")
+
+    stats = storage.get_stats()
+    assert stats["total_messages"] == 3
+    assert stats["senders_count"] == 2
+    assert sorted((s["sender"], s["count"]) for s in stats["messages_per_sender"]) == [
+        ("+111", 2),
+        ("+333", 1),
+    ]
+    assert stats["first_message_ts"] == "2025-01-01T00:00:00Z"
+    assert stats["last_message_ts"] == "2025-01-09T00:00:00Z"